@@ -8,9 +8,13 @@ Available cycles with hs-CRP:
 NOTE: 2011-2014 does NOT have CRP data - excluded from analysis
 """
 
+import atexit
 import os
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import urllib3
 
 # Disable SSL warnings
@@ -24,6 +28,9 @@ DATA_RAW = PROJECT_ROOT / "data" / "raw"
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
     'Accept': '*/*',
+    # Byte counts and Range offsets must refer to the raw file, not a
+    # compressed transfer encoding of it
+    'Accept-Encoding': 'identity',
 }
 
 # Base URL
@@ -32,6 +39,27 @@ BASE_URL = "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public"
 # Drug database for statin identification
 DRUG_DB_URL = "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/1988/DataFiles/RXQ_DRUG.xpt"
 
+# Concurrent downloads per cycle (bounded to stay polite to the CDC server)
+MAX_WORKERS = 8
+
+
+def build_session() -> requests.Session:
+    """Create the pooled keep-alive session used for every CDC download."""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    session.verify = False
+    session.mount("https://", HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=16,
+        max_retries=Retry(total=3, backoff_factor=0.5),
+    ))
+    return session
+
+
+# Single session shared by all cycles and the drug database download
+SESSION = build_session()
+atexit.register(SESSION.close)
+
 # =============================================================================
 # FILE DEFINITIONS BY CYCLE
 # =============================================================================
@@ -140,26 +168,114 @@ FILES_2017_2020 = {
 }
 
 
+def remote_file_size(url: str) -> int:
+    """Return the server-reported Content-Length for url (0 if unknown)."""
+    try:
+        head = SESSION.head(url, timeout=30, allow_redirects=True)
+        return int(head.headers.get('Content-Length', 0))
+    except (requests.RequestException, ValueError):
+        return 0
+
+
+def range_starts_at(response: requests.Response, offset: int) -> bool:
+    """Check that a 206 response's Content-Range begins at byte offset."""
+    content_range = response.headers.get('Content-Range', '')
+    # Format: "bytes <start>-<end>/<total>"
+    try:
+        start = int(content_range.split()[1].split('-')[0])
+    except (IndexError, ValueError):
+        return False
+    return start == offset
+
+
+def resume_validator(headers: requests.structures.CaseInsensitiveDict) -> str:
+    """Return the validator to send as If-Range for these response headers ('' if none)."""
+    etag = headers.get('ETag', '')
+    if etag and not etag.startswith('W/'):  # If-Range only accepts strong ETags
+        return etag
+    return headers.get('Last-Modified', '')
+
+
 def download_file(url: str, dest_path: Path, min_size: int = 1000) -> bool:
-    """Download a file with proper headers."""
+    """
+    Download a file with proper headers, resuming partial downloads.
+    
+    Data is streamed into a sibling .part file which is fsynced and atomically
+    renamed onto dest_path only once complete, so an interrupted run never
+    leaves a truncated file under the final name. The validator of the
+    response that started the .part file is kept beside it and sent as
+    If-Range on resume, so a file revised since then is fetched again in full.
+    """
+    tmp_path = dest_path.with_suffix(dest_path.suffix + '.part')
+    validator_path = tmp_path.with_suffix(tmp_path.suffix + '.validator')
     try:
-        if dest_path.exists() and dest_path.stat().st_size > min_size:
-            print(f"  [EXISTS] {dest_path.name}")
-            return True
+        remote_size = remote_file_size(url)
+        
+        if dest_path.exists():
+            size = dest_path.stat().st_size
+            # Skip complete files (fall back to size threshold if HEAD gave nothing)
+            if (remote_size and size == remote_size) or (not remote_size and size > min_size):
+                print(f"  [EXISTS] {dest_path.name}")
+                return True
+            # Wrong size: a truncated file from an older run or a file CDC has
+            # since revised. Its bytes may not be a prefix of the current
+            # file, so fetch it again in full (only .part files are resumed)
+            dest_path.unlink()
+            tmp_path.unlink(missing_ok=True)
+            validator_path.unlink(missing_ok=True)
+        
+        local_size = tmp_path.stat().st_size if tmp_path.exists() else 0
+        validator = validator_path.read_text() if validator_path.exists() else ''
+        
+        headers = {}
+        if 0 < local_size < remote_size and validator:
+            # Server answers 200 with the full file if it changed since then
+            headers = {'Range': f'bytes={local_size}-', 'If-Range': validator}
+            print(f"  [RESUMING] {dest_path.name} from {local_size:,} bytes...")
+        else:
+            print(f"  [DOWNLOADING] {dest_path.name}...")
+        
+        response = SESSION.get(url, headers=headers, timeout=120, stream=True)
+        if response.status_code == 206 and not range_starts_at(response, local_size):
+            # Partial content that does not continue the .part file: start over
+            response.close()
+            response = SESSION.get(url, timeout=120, stream=True)
+        
+        with response:
+            if response.status_code == 206:
+                mode = 'ab'
+            elif response.status_code == 200:
+                # Fresh download, file changed, or server ignored the Range
+                # request: start over and record the validator for resuming
+                mode = 'wb'
+                validator_path.write_text(resume_validator(response.headers))
+            else:
+                print(f"  [FAILED] {dest_path.name} - Status {response.status_code}")
+                return False
             
-        print(f"  [DOWNLOADING] {dest_path.name}...")
-        response = requests.get(url, headers=HEADERS, verify=False, timeout=120)
+            with open(tmp_path, mode) as f:
+                for chunk in response.iter_content(chunk_size=1 << 20):
+                    f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
         
-        if response.status_code == 200 and len(response.content) > min_size:
-            with open(dest_path, 'wb') as f:
-                f.write(response.content)
-            print(f"  [SUCCESS] {dest_path.name} ({len(response.content):,} bytes)")
+        n_bytes = tmp_path.stat().st_size
+        validator_path.unlink(missing_ok=True)  # .part is now either renamed or removed
+        if remote_size and n_bytes != remote_size:
+            tmp_path.unlink(missing_ok=True)
+            print(f"  [FAILED] {dest_path.name} - Got {n_bytes:,} of {remote_size:,} bytes")
+            return False
+        elif n_bytes > min_size:
+            os.replace(tmp_path, dest_path)
+            print(f"  [SUCCESS] {dest_path.name} ({n_bytes:,} bytes)")
             return True
         else:
-            print(f"  [FAILED] {dest_path.name} - Status {response.status_code}")
+            tmp_path.unlink(missing_ok=True)
+            print(f"  [FAILED] {dest_path.name} - Only {n_bytes:,} bytes received")
             return False
             
     except Exception as e:
+        # Any .part file is kept so the next run can resume it
         print(f"  [ERROR] {dest_path.name}: {e}")
         return False
 
@@ -174,10 +290,14 @@ def download_cycle(cycle_name: str, files: dict):
     cycle_dir.mkdir(parents=True, exist_ok=True)
     
     success_count = 0
-    for filename, url in files.items():
-        dest_path = cycle_dir / filename
-        if download_file(url, dest_path):
-            success_count += 1
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        futures = {
+            ex.submit(download_file, url, cycle_dir / filename): filename
+            for filename, url in files.items()
+        }
+        for future in as_completed(futures):
+            if future.result():
+                success_count += 1
     
     print(f"\n  Downloaded {success_count}/{len(files)} files")
 
@@ -16,7 +16,10 @@ RIR Definition: statin use + LDL-C <70 + hs-CRP ≥2 mg/L
 
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+import os
+import sys
 import warnings
 import re
 
@@ -47,14 +50,99 @@ STATIN_PATTERNS = [
     r'liptruzet',      # ezetimibe + atorvastatin
 ]
 
+# Compiled once at import; reused for every cycle's prescription file
+STATIN_RE = re.compile('|'.join(STATIN_PATTERNS), re.IGNORECASE)
+
 # Therapeutic class codes for statins (if available in drug database)
 STATIN_CLASS_CODES = ['CV350', 'CV351', 'CV352', 'CV359']  # HMG-CoA reductase inhibitors
 
+# =============================================================================
+# COMPONENT VARIABLES
+# =============================================================================
+
+# SAS variables kept from each component file (everything else is dropped at load)
+COMPONENT_COLS = {
+    'DEMO': ['SEQN', 'RIDAGEYR', 'RIAGENDR', 'RIDRETH1', 'RIDRETH3',
+             'SDMVPSU', 'SDMVSTRA', 'WTMEC2YR', 'WTMECPRP'],
+    'CRP': ['SEQN', 'LBXCRP'],
+    'HSCRP': ['SEQN', 'LBXHSCRP'],
+    'TCHOL': ['SEQN', 'LBXTC'],
+    'HDL': ['SEQN', 'LBDHDD', 'LBXHDD'],
+    'TRIGLY': ['SEQN', 'LBXTR', 'WTSAF2YR', 'WTSAFPRP'],  # Fasting weights live here
+    'BMX': ['SEQN', 'BMXBMI'],
+    'BPX': ['SEQN', 'BPXSY1', 'BPXSY2', 'BPXSY3', 'BPXSY4',
+            'BPXDI1', 'BPXDI2', 'BPXDI3', 'BPXDI4'],
+    'BPXO': ['SEQN', 'BPXOSY1', 'BPXOSY2', 'BPXOSY3',
+             'BPXODI1', 'BPXODI2', 'BPXODI3'],
+    'BPQ': ['SEQN', 'BPQ040A'],
+    'DIQ': ['SEQN', 'DIQ010'],
+    'GHB': ['SEQN', 'LBXGH'],
+    'GLU': ['SEQN', 'LBXGLU'],
+    'SMQ': ['SEQN', 'SMQ020', 'SMQ040'],
+    'MCQ': ['SEQN', 'MCQ160B', 'MCQ160C', 'MCQ160D', 'MCQ160E', 'MCQ160F'],
+    'RXQ_RX': ['SEQN', 'RXDDRUG', 'RXD240B', 'RXDDRGID'],
+}
+
+# Rows decoded per read_sas chunk when projecting columns
+XPT_CHUNK_ROWS = 50_000
+
+# Cross-cycle harmonization: source column -> (target column, converter or None).
+# Applied per cycle only when the target is absent.
+HARMONIZATION = {
+    # CRP: LBXCRP (2005-2010) is in mg/dL; LBXHSCRP (2015+) is in mg/L
+    'LBXCRP': ('LBXHSCRP', lambda crp: crp * 10),
+    # Fasting weights: WTSAF2YR (2005-2016) vs WTSAFPRP (2017-2020)
+    'WTSAFPRP': ('WTSAF2YR', None),
+    # MEC weights: WTMEC2YR (2005-2016) vs WTMECPRP (2017-2020)
+    'WTMECPRP': ('WTMEC2YR', None),
+    # HDL: LBDHDD vs LBXHDD
+    'LBXHDD': ('LBDHDD', None),
+}
+
+# Source columns build_analytic_cohort reads directly (NaN-filled if absent)
+REQUIRED_COLS = [
+    'RIDRETH1', 'LBXHSCRP', 'LBXTC', 'LBDHDD', 'LBXTR', 'WTSAF2YR', 'WTMEC2YR',
+    'BMXBMI', 'LBXGH', 'LBXGLU', 'BPQ040A', 'DIQ010', 'SMQ020', 'SMQ040',
+    'MCQ160B', 'MCQ160C', 'MCQ160D', 'MCQ160E', 'MCQ160F',
+]
+
+# Cycles from the 2017-March 2020 pre-pandemic release
+PREPANDEMIC_CYCLES = {'2017-2020'}
+
+# Harmonized per-cycle columns read by build_analytic_cohort (all else dropped
+# before the cycles are combined)
+KEEP_COLS = [
+    'SEQN', 'cycle', 'is_prepandemic', 'statin_use',
+    'RIDAGEYR', 'RIAGENDR', 'RIDRETH1', 'RIDRETH3',
+    'SDMVPSU', 'SDMVSTRA', 'WTMEC2YR', 'WTSAF2YR',
+    'LBXHSCRP', 'LBXTC', 'LBDHDD', 'LBXTR', 'LBXGH', 'LBXGLU', 'BMXBMI',
+    'DIQ010', 'BPQ040A', 'SMQ020', 'SMQ040',
+    'MCQ160B', 'MCQ160C', 'MCQ160D', 'MCQ160E', 'MCQ160F',
+    'BPXSY1', 'BPXSY2', 'BPXSY3', 'BPXSY4',
+    'BPXDI1', 'BPXDI2', 'BPXDI3', 'BPXDI4',
+    'BPXOSY1', 'BPXOSY2', 'BPXOSY3',
+    'BPXODI1', 'BPXODI2', 'BPXODI3',
+]
+
 
-def load_xpt(filepath: Path) -> pd.DataFrame:
-    """Load XPT file into pandas DataFrame."""
+def load_xpt(filepath: Path, usecols: list = None) -> pd.DataFrame:
+    """
+    Load XPT file into pandas DataFrame.
+    
+    If usecols is given, the file is read in chunks and only those columns
+    are kept, so unused variables are never accumulated in memory.
+    """
     try:
-        return pd.read_sas(filepath, format='xport', encoding='latin1')
+        if usecols is None:
+            return pd.read_sas(filepath, format='xport', encoding='latin1')
+        
+        wanted = set(usecols)
+        chunks = []
+        with pd.read_sas(filepath, format='xport', encoding='latin1',
+                         chunksize=XPT_CHUNK_ROWS) as reader:
+            for chunk in reader:
+                chunks.append(chunk[[c for c in chunk.columns if c in wanted]])
+        return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
     except Exception as e:
         print(f"  Warning: Could not load {filepath.name}: {e}")
         return pd.DataFrame()
@@ -68,6 +156,11 @@ def find_file(cycle_dir: Path, pattern: str) -> Path:
     return None
 
 
+def is_statin_drug(drug_name: str) -> bool:
+    """Return True if a prescription drug name matches a statin pattern."""
+    return STATIN_RE.search(drug_name) is not None
+
+
 def identify_statin_users(rx_df: pd.DataFrame, drug_db: pd.DataFrame = None) -> pd.Series:
     """
     Identify statin users from prescription medication file.
@@ -92,16 +185,15 @@ def identify_statin_users(rx_df: pd.DataFrame, drug_db: pd.DataFrame = None) ->
         print("  Warning: No drug name column found")
         return pd.Series(dtype=int)
     
-    # Convert drug names to lowercase for matching
-    rx_df = rx_df.copy()
-    rx_df['drug_lower'] = rx_df[drug_col].astype(str).str.lower()
+    # Match statin patterns once per distinct drug name, then broadcast to rows
+    codes, drug_names = pd.factorize(rx_df[drug_col].astype(str))
+    is_statin = np.array([is_statin_drug(name) for name in drug_names], dtype=bool)[codes]
     
-    # Match statin patterns
-    statin_pattern = '|'.join(STATIN_PATTERNS)
-    rx_df['is_statin'] = rx_df['drug_lower'].str.contains(statin_pattern, regex=True, na=False)
-    
-    # Aggregate to participant level
-    statin_users = rx_df.groupby('SEQN')['is_statin'].any().astype(int)
+    # Aggregate to participant level: any statin record per SEQN
+    seqn, inverse = np.unique(rx_df['SEQN'].to_numpy(), return_inverse=True)
+    any_statin = np.zeros(len(seqn), dtype=bool)
+    np.logical_or.at(any_statin, inverse, is_statin)
+    statin_users = pd.Series(any_statin.astype(int), index=seqn)
     
     return statin_users
 
@@ -111,59 +203,73 @@ def compute_ldl_friedewald(tchol: pd.Series, hdl: pd.Series, trigly: pd.Series)
     Calculate LDL using Friedewald equation: LDL = TC - HDL - (TG/5)
     Only valid when TG < 400 mg/dL.
     """
-    ldl = tchol - hdl - (trigly / 5)
-    ldl[trigly >= 400] = np.nan
-    ldl[ldl < 0] = np.nan  # Invalid negative values
-    return ldl
+    tc = tchol.to_numpy(dtype=np.float64)
+    tg = trigly.to_numpy(dtype=np.float64)
+    
+    ldl = tc - hdl.to_numpy(dtype=np.float64)
+    ldl -= tg / 5
+    ldl[(tg >= 400) | (ldl < 0)] = np.nan  # Invalid TG range or negative values
+    return pd.Series(ldl, index=tchol.index)
 
 
-def define_hypertension(df: pd.DataFrame) -> pd.Series:
+def column_values(df: pd.DataFrame, col: str) -> np.ndarray:
+    """Return a column as a float ndarray (present via the REQUIRED_COLS reindex)."""
+    return df[col].to_numpy(dtype=np.float64)
+
+
+def row_nanmean(df: pd.DataFrame, cols: list) -> np.ndarray:
+    """Row-wise mean of cols ignoring NaN (all-NaN if no columns)."""
+    if not cols:
+        return np.full(len(df), np.nan)
+    return np.nanmean(df[cols].to_numpy(dtype=np.float64, na_value=np.nan), axis=1)
+
+
+def define_hypertension(df: pd.DataFrame, sbp_cols: list, dbp_cols: list) -> pd.Series:
     """Define hypertension: SBP ≥130 OR DBP ≥80 OR on BP medication."""
-    sbp_cols = [c for c in df.columns if 'BPXSY' in c or 'BPXOSY' in c]
-    dbp_cols = [c for c in df.columns if 'BPXDI' in c or 'BPXODI' in c]
-    
-    mean_sbp = df[sbp_cols].mean(axis=1) if sbp_cols else pd.Series([np.nan] * len(df))
-    mean_dbp = df[dbp_cols].mean(axis=1) if dbp_cols else pd.Series([np.nan] * len(df))
+    mean_sbp = row_nanmean(df, sbp_cols)
+    mean_dbp = row_nanmean(df, dbp_cols)
     
-    bp_med = df.get('BPQ040A', pd.Series([np.nan] * len(df)))
+    bp_med = column_values(df, 'BPQ040A')
     
-    htn = ((mean_sbp >= 130) | (mean_dbp >= 80) | (bp_med == 1)).astype(float)
-    return htn
+    htn = (mean_sbp >= 130) | (mean_dbp >= 80) | (bp_med == 1)
+    return pd.Series(htn.astype(float), index=df.index)
 
 
 def define_diabetes(df: pd.DataFrame) -> pd.Series:
     """Define diabetes: HbA1c ≥6.5% OR FPG ≥126 OR told by doctor OR on meds."""
-    hba1c = df.get('LBXGH', pd.Series([np.nan] * len(df)))
-    glucose = df.get('LBXGLU', pd.Series([np.nan] * len(df)))
-    told = df.get('DIQ010', pd.Series([np.nan] * len(df)))
+    hba1c = column_values(df, 'LBXGH')
+    glucose = column_values(df, 'LBXGLU')
+    told = column_values(df, 'DIQ010')
     
-    dm = ((hba1c >= 6.5) | (glucose >= 126) | (told == 1)).astype(float)
-    return dm
+    dm = (hba1c >= 6.5) | (glucose >= 126) | (told == 1)
+    return pd.Series(dm.astype(float), index=df.index)
 
 
 def define_smoking_status(df: pd.DataFrame) -> pd.Series:
     """Define smoking: 0=Never, 1=Former, 2=Current."""
-    smoke_100 = df.get('SMQ020', pd.Series([np.nan] * len(df)))
-    smoke_now = df.get('SMQ040', pd.Series([np.nan] * len(df)))
+    smoke_100 = column_values(df, 'SMQ020')
+    smoke_now = column_values(df, 'SMQ040')
     
-    status = pd.Series([np.nan] * len(df), index=df.index)
-    status[smoke_100 == 2] = 0  # Never
-    status[(smoke_100 == 1) & smoke_now.isin([1, 2])] = 2  # Current
-    status[(smoke_100 == 1) & (smoke_now == 3)] = 1  # Former
-    
-    return status
+    status = np.select(
+        [
+            smoke_100 == 2,                                            # Never
+            (smoke_100 == 1) & ((smoke_now == 1) | (smoke_now == 2)),  # Current
+            (smoke_100 == 1) & (smoke_now == 3),                       # Former
+        ],
+        [0, 2, 1],
+        default=np.nan,
+    )
+    return pd.Series(status, index=df.index)
 
 
 def define_cvd_history(df: pd.DataFrame) -> pd.Series:
-    """Define self-reported CVD history."""
-    chd = df.get('MCQ160C', pd.Series([2] * len(df)))
-    mi = df.get('MCQ160E', pd.Series([2] * len(df)))
-    stroke = df.get('MCQ160F', pd.Series([2] * len(df)))
-    angina = df.get('MCQ160D', pd.Series([2] * len(df)))
-    chf = df.get('MCQ160B', pd.Series([2] * len(df)))
-    
-    cvd = ((chd == 1) | (mi == 1) | (stroke == 1) | (angina == 1) | (chf == 1)).astype(float)
-    return cvd
+    """Define self-reported CVD history (CHF, CHD, angina, MI, stroke)."""
+    mcq = np.column_stack([
+        column_values(df, col)
+        for col in ['MCQ160B', 'MCQ160C', 'MCQ160D', 'MCQ160E', 'MCQ160F']
+    ])
+    cvd = (mcq == 1).any(axis=1)
+    return pd.Series(cvd.astype(float), index=df.index)
 
 
 def process_cycle(cycle: str, cycle_dir: Path) -> pd.DataFrame:
@@ -176,16 +282,13 @@ def process_cycle(cycle: str, cycle_dir: Path) -> pd.DataFrame:
         print(f"  Directory not found: {cycle_dir}")
         return pd.DataFrame()
     
-    # Determine if pre-pandemic 2017-2020
-    is_prepandemic = "2017" in cycle
-    
     # Load demographics
     demo_file = find_file(cycle_dir, "DEMO")
     if not demo_file:
         print("  No DEMO file found")
         return pd.DataFrame()
     
-    df = load_xpt(demo_file)
+    df = load_xpt(demo_file, COMPONENT_COLS['DEMO'])
     print(f"  Loaded {len(df):,} participants from DEMO")
     
     # Merge component files
@@ -195,7 +298,6 @@ def process_cycle(cycle: str, cycle_dir: Path) -> pd.DataFrame:
         ("TCHOL", "Total cholesterol"),
         ("HDL", "HDL"),
         ("TRIGLY", "Triglycerides"),
-        ("FASTQX", "Fasting weights"),
         ("BMX", "Body measures"),
         ("BPX", "Blood pressure"),
         ("BPXO", "Blood pressure (oscillometric)"),
@@ -207,18 +309,28 @@ def process_cycle(cycle: str, cycle_dir: Path) -> pd.DataFrame:
         ("MCQ", "Medical conditions"),
     ]
     
+    # Collect components indexed on SEQN, then join them onto DEMO in one pass
+    comp_frames = []
+    seen_cols = set(df.columns)
     for pattern, description in components:
         file_path = find_file(cycle_dir, pattern)
         if file_path:
-            comp_df = load_xpt(file_path)
-            if 'SEQN' in comp_df.columns and len(comp_df) > 0:
-                df = df.merge(comp_df, on='SEQN', how='left', suffixes=('', f'_{pattern}'))
+            comp_df = load_xpt(file_path, COMPONENT_COLS[pattern])
+            # Skip files with none of the wanted variables (e.g. "CRP" matching HSCRP_I)
+            if 'SEQN' in comp_df.columns and len(comp_df) > 0 and comp_df.shape[1] > 1:
+                comp_df = comp_df.drop_duplicates('SEQN').set_index('SEQN')
+                comp_df = comp_df[[c for c in comp_df.columns if c not in seen_cols]]
+                seen_cols.update(comp_df.columns)
+                comp_frames.append(comp_df)
                 print(f"  Merged {description}: {len(comp_df):,} records")
     
+    if comp_frames:
+        df = df.set_index('SEQN').join(comp_frames, how='left').reset_index()
+    
     # Load prescription data and identify statin users
     rx_file = find_file(cycle_dir, "RXQ_RX")
     if rx_file:
-        rx_df = load_xpt(rx_file)
+        rx_df = load_xpt(rx_file, COMPONENT_COLS['RXQ_RX'])
         print(f"  Loaded prescription data: {len(rx_df):,} medication records")
         statin_users = identify_statin_users(rx_df)
         df['statin_use'] = df['SEQN'].map(statin_users).fillna(0).astype(int)
@@ -229,28 +341,19 @@ def process_cycle(cycle: str, cycle_dir: Path) -> pd.DataFrame:
     
     # Add cycle info
     df['cycle'] = cycle
-    df['is_prepandemic'] = is_prepandemic
-    
-    # Harmonize variable names across cycles
-    # CRP: LBXCRP (2005-2010) is in mg/dL; LBXHSCRP (2015+) is in mg/L
-    # Convert 2005-2010 CRP from mg/dL to mg/L by multiplying by 10
-    if 'LBXCRP' in df.columns and 'LBXHSCRP' not in df.columns:
-        df['LBXHSCRP'] = df['LBXCRP'] * 10  # Convert mg/dL to mg/L
-        print(f"  Converted LBXCRP (mg/dL) to mg/L for {cycle}")
-    
-    # Fasting weights: WTSAF2YR (2005-2016) vs WTSAFPRP (2017-2020)
-    if 'WTSAFPRP' in df.columns and 'WTSAF2YR' not in df.columns:
-        df['WTSAF2YR'] = df['WTSAFPRP']
-    
-    # MEC weights: WTMEC2YR (2005-2016) vs WTMECPRP (2017-2020)
-    if 'WTMECPRP' in df.columns and 'WTMEC2YR' not in df.columns:
-        df['WTMEC2YR'] = df['WTMECPRP']
+    df['is_prepandemic'] = cycle in PREPANDEMIC_CYCLES
     
-    # HDL: LBDHDD vs LBXHDD
-    if 'LBXHDD' in df.columns and 'LBDHDD' not in df.columns:
-        df['LBDHDD'] = df['LBXHDD']
+    # Harmonize variable names/units across cycles (see HARMONIZATION)
+    for source, (target, convert) in HARMONIZATION.items():
+        if source in df.columns and target not in df.columns:
+            if convert is None:
+                df[target] = df[source]
+            else:
+                df[target] = convert(df[source])
+                print(f"  Converted {source} to {target} units for {cycle}")
     
-    return df
+    # Drop raw source columns so the cross-cycle concat stays narrow
+    return df.loc[:, df.columns.intersection(KEEP_COLS, sort=False)]
 
 
 def build_analytic_cohort(df: pd.DataFrame) -> pd.DataFrame:
@@ -259,56 +362,65 @@ def build_analytic_cohort(df: pd.DataFrame) -> pd.DataFrame:
     print("Building analytic cohort")
     print("="*60)
     
+    # Add any source columns missing from every cycle as NaN in one step
+    df = df.reindex(columns=df.columns.union(REQUIRED_COLS, sort=False))
+    
     # Demographics
     df['age'] = df['RIDAGEYR']
     df['sex'] = df['RIAGENDR']  # 1=Male, 2=Female
-    df['female'] = (df['sex'] == 2).astype(int)
+    df['female'] = df['sex'] == 2
     
     # Race/ethnicity (use RIDRETH1 for 2005-2010, RIDRETH3 for 2015+)
     if 'RIDRETH3' in df.columns:
         df['race_eth'] = df['RIDRETH3']
     else:
-        df['race_eth'] = df.get('RIDRETH1', pd.Series([np.nan] * len(df)))
+        df['race_eth'] = df['RIDRETH1']
     
     # hs-CRP (harmonized to LBXHSCRP in process_cycle)
-    df['hscrp'] = df.get('LBXHSCRP', pd.Series([np.nan] * len(df), index=df.index))
+    df['hscrp'] = df['LBXHSCRP']
     print(f"  hs-CRP available for {df['hscrp'].notna().sum():,} participants")
     
     # Lipids (LBDHDD harmonized in process_cycle)
-    df['tchol'] = df.get('LBXTC', pd.Series([np.nan] * len(df), index=df.index))
-    df['hdl'] = df.get('LBDHDD', pd.Series([np.nan] * len(df), index=df.index))
-    df['trigly'] = df.get('LBXTR', pd.Series([np.nan] * len(df), index=df.index))
+    df['tchol'] = df['LBXTC']
+    df['hdl'] = df['LBDHDD']
+    df['trigly'] = df['LBXTR']
     
     # Calculate LDL (Friedewald)
     df['ldl'] = compute_ldl_friedewald(df['tchol'], df['hdl'], df['trigly'])
     print(f"  LDL-C available for {df['ldl'].notna().sum():,} participants")
     
     # Fasting status and weights (harmonized to WTSAF2YR in process_cycle)
-    df['fasting_weight'] = df.get('WTSAF2YR', pd.Series([np.nan] * len(df), index=df.index))
-    df['in_fasting_subsample'] = df['fasting_weight'].notna().astype(int)
+    df['fasting_weight'] = df['WTSAF2YR']
+    df['in_fasting_subsample'] = df['fasting_weight'].notna()
     print(f"  Fasting subsample: {df['in_fasting_subsample'].sum():,} participants")
     
-    # Survey design variables
-    df['mec_weight'] = df.get('WTMEC2YR', df.get('WTMECPRP', pd.Series([np.nan] * len(df))))
+    # Survey design variables (WTMEC2YR harmonized in process_cycle)
+    df['mec_weight'] = df['WTMEC2YR']
     df['psu'] = df['SDMVPSU']
     df['strata'] = df['SDMVSTRA']
     
     # BMI
-    df['bmi'] = df.get('BMXBMI', pd.Series([np.nan] * len(df)))
-    df['bmi_cat'] = pd.cut(df['bmi'], 
-                           bins=[0, 18.5, 25, 30, 100],
-                           labels=['Underweight', 'Normal', 'Overweight', 'Obese'])
-    df['obesity'] = (df['bmi'] >= 30).astype(int)
+    df['bmi'] = df['BMXBMI']
+    # Right-closed bins (0, 18.5], (18.5, 25], (25, 30], (30, 100]; else missing
+    bmi = df['bmi'].to_numpy(dtype=np.float64)
+    bmi_codes = np.digitize(bmi, [18.5, 25, 30], right=True).astype(np.int8)
+    bmi_codes[~((bmi > 0) & (bmi <= 100))] = -1
+    df['bmi_cat'] = pd.Categorical.from_codes(
+        bmi_codes, categories=['Underweight', 'Normal', 'Overweight', 'Obese'], ordered=True
+    )
+    df['obesity'] = df['bmi'] >= 30
     
     # Clinical conditions
-    df['hypertension'] = define_hypertension(df)
+    sbp_cols = [c for c in df.columns if c.startswith(('BPXSY', 'BPXOSY'))]
+    dbp_cols = [c for c in df.columns if c.startswith(('BPXDI', 'BPXODI'))]
+    df['hypertension'] = define_hypertension(df, sbp_cols, dbp_cols)
     df['diabetes'] = define_diabetes(df)
-    df['hba1c'] = df.get('LBXGH', pd.Series([np.nan] * len(df)))
-    df['fasting_glucose'] = df.get('LBXGLU', pd.Series([np.nan] * len(df)))
+    df['hba1c'] = df['LBXGH']
+    df['fasting_glucose'] = df['LBXGLU']
     
     # Smoking
     df['smoking_status'] = define_smoking_status(df)
-    df['current_smoker'] = (df['smoking_status'] == 2).astype(int)
+    df['current_smoker'] = df['smoking_status'] == 2
     
     # CVD history
     df['cvd_history'] = define_cvd_history(df)
@@ -325,7 +437,7 @@ def build_analytic_cohort(df: pd.DataFrame) -> pd.DataFrame:
     print(f"  Total participants: {n_total:,}")
     
     # Age ≥20
-    df['age_eligible'] = (df['age'] >= 20).astype(int)
+    df['age_eligible'] = df['age'] >= 20
     n_age = df['age_eligible'].sum()
     print(f"  Age ≥20: {n_age:,}")
     
@@ -335,17 +447,17 @@ def build_analytic_cohort(df: pd.DataFrame) -> pd.DataFrame:
     print(f"  In fasting subsample: {n_fasting:,}")
     
     # Non-missing hs-CRP
-    df['crp_available'] = df['hscrp'].notna().astype(int)
+    df['crp_available'] = df['hscrp'].notna()
     n_crp = (df['age_eligible'] & df['fasting_eligible'] & df['crp_available']).sum()
     print(f"  hs-CRP available: {n_crp:,}")
     
     # Non-missing LDL
-    df['ldl_available'] = df['ldl'].notna().astype(int)
+    df['ldl_available'] = df['ldl'].notna()
     n_ldl = (df['age_eligible'] & df['fasting_eligible'] & df['crp_available'] & df['ldl_available']).sum()
     print(f"  LDL-C available: {n_ldl:,}")
     
     # Exclude hs-CRP >10 (acute inflammation)
-    df['crp_valid'] = (df['hscrp'] <= 10).astype(int)
+    df['crp_valid'] = df['hscrp'] <= 10
     
     # Overall eligibility
     df['eligible'] = (
@@ -354,12 +466,12 @@ def build_analytic_cohort(df: pd.DataFrame) -> pd.DataFrame:
         df['crp_available'] & 
         df['ldl_available'] &
         df['crp_valid']
-    ).astype(int)
+    )
     n_eligible = df['eligible'].sum()
     print(f"\n  Overall eligible: {n_eligible:,}")
     
     # Statin users in eligible population
-    df['statin_eligible'] = (df['eligible'] & df['statin_use']).astype(int)
+    df['statin_eligible'] = df['eligible'] & (df['statin_use'] == 1)
     n_statin = df['statin_eligible'].sum()
     print(f"  Statin users (eligible): {n_statin:,}")
     
@@ -372,14 +484,14 @@ def build_analytic_cohort(df: pd.DataFrame) -> pd.DataFrame:
     print("-"*40)
     
     # Primary analytic cohort: statin users with LDL <70
-    df['ldl_lt70'] = (df['ldl'] < 70).astype(int)
-    df['primary_cohort'] = (df['statin_eligible'] & df['ldl_lt70']).astype(int)
+    df['ldl_lt70'] = df['ldl'] < 70
+    df['primary_cohort'] = df['statin_eligible'] & df['ldl_lt70']
     n_primary = df['primary_cohort'].sum()
     print(f"  Statin + LDL <70 (primary cohort): {n_primary:,}")
     
     # RIR definition: hs-CRP ≥2 mg/L
-    df['crp_elevated'] = (df['hscrp'] >= 2).astype(int)
-    df['rir'] = (df['primary_cohort'] & df['crp_elevated']).astype(int)
+    df['crp_elevated'] = df['hscrp'] >= 2
+    df['rir'] = df['primary_cohort'] & df['crp_elevated']
     n_rir = df['rir'].sum()
     print(f"  RIR (hs-CRP ≥2): {n_rir:,}")
     
@@ -388,11 +500,11 @@ def build_analytic_cohort(df: pd.DataFrame) -> pd.DataFrame:
         print(f"  RIR prevalence in primary cohort: {rir_pct:.1f}%")
     
     # Sensitivity definitions
-    df['rir_crp3'] = (df['primary_cohort'] & (df['hscrp'] >= 3)).astype(int)
+    df['rir_crp3'] = df['primary_cohort'] & (df['hscrp'] >= 3)
     
-    df['ldl_lt55'] = (df['ldl'] < 55).astype(int)
-    df['cohort_ldl55'] = (df['statin_eligible'] & df['ldl_lt55']).astype(int)
-    df['rir_ldl55'] = (df['cohort_ldl55'] & df['crp_elevated']).astype(int)
+    df['ldl_lt55'] = df['ldl'] < 55
+    df['cohort_ldl55'] = df['statin_eligible'] & df['ldl_lt55']
+    df['rir_ldl55'] = df['cohort_ldl55'] & df['crp_elevated']
     
     print(f"  Sensitivity: RIR (hs-CRP ≥3): {df['rir_crp3'].sum():,}")
     print(f"  Sensitivity: LDL <55 cohort: {df['cohort_ldl55'].sum():,}")
@@ -416,18 +528,19 @@ def main():
         ("2017-2020", DATA_RAW / "2017-2020"),
     ]
     
-    all_data = []
-    for cycle_name, cycle_dir in cycles:
-        df = process_cycle(cycle_name, cycle_dir)
-        if len(df) > 0:
-            all_data.append(df)
+    # Cycles are independent: process them in parallel worker processes
+    # (map preserves cycle order in the results)
+    n_workers = min(len(cycles), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=n_workers) as ex:
+        results = ex.map(process_cycle, *zip(*cycles))
+        all_data = [df for df in results if len(df) > 0]
     
     if not all_data:
         print("\nNo data loaded. Run 01_download_data.py first.")
         return
     
     # Combine cycles
-    combined = pd.concat(all_data, ignore_index=True)
+    combined = pd.concat(all_data, ignore_index=True, copy=False)
     print(f"\n{'='*60}")
     print(f"Combined: {len(combined):,} participants across all cycles")
     print('='*60)
@@ -469,16 +582,33 @@ def main():
     
     export_vars = [v for v in export_vars if v in combined.columns]
     
+    # Compact dtypes: bool flags cast to int8 in one batch, low-cardinality
+    # codes as categoricals
+    flag_cols = [
+        'female', 'statin_use', 'ldl_lt70', 'ldl_lt55', 'crp_elevated',
+        'obesity', 'current_smoker', 'eligible', 'in_fasting_subsample',
+        'crp_valid', 'statin_eligible', 'primary_cohort',
+        'rir', 'rir_crp3', 'cohort_ldl55', 'rir_ldl55', 'is_prepandemic',
+        'age_eligible', 'fasting_eligible', 'crp_available', 'ldl_available',
+    ]
+    flag_cols = [c for c in flag_cols if c in combined.columns]
+    combined[flag_cols] = combined[flag_cols].astype('int8')
+    for col in ['cycle', 'bmi_cat', 'race_eth']:
+        combined[col] = combined[col].astype('category')
+    
     # Save
     DATA_PROCESSED.mkdir(parents=True, exist_ok=True)
     
     output_path = DATA_PROCESSED / "rir_cohort.parquet"
-    combined[export_vars].to_parquet(output_path)
+    combined[export_vars].to_parquet(output_path, engine='pyarrow',
+                                     compression='zstd', use_dictionary=True)
     print(f"\nSaved: {output_path}")
     
-    csv_path = DATA_PROCESSED / "rir_cohort.csv"
-    combined[export_vars].to_csv(csv_path, index=False)
-    print(f"Saved: {csv_path}")
+    # CSV is read by the R analysis scripts; pass --no-csv to skip it
+    if '--no-csv' not in sys.argv:
+        csv_path = DATA_PROCESSED / "rir_cohort.csv"
+        combined[export_vars].to_csv(csv_path, index=False)
+        print(f"Saved: {csv_path}")
     
     # Summary
     print("\n" + "="*60)
@@ -10,7 +10,16 @@ RIR Study - Data Processing and Cohort Creation
 
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pcsv
+import pyarrow.parquet as pq
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 from pathlib import Path
+import io
+import os
+import re
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -18,6 +27,7 @@ warnings.filterwarnings('ignore')
 PROJECT_ROOT = Path(__file__).parent.parent
 DATA_RAW = PROJECT_ROOT / "data" / "raw"
 DATA_PROCESSED = PROJECT_ROOT / "data" / "processed"
+XPT_CACHE = PROJECT_ROOT / "data" / "interim" / "xpt_cache"
 OUTPUT_DIR = PROJECT_ROOT / "output"
 
 # NHANES cycles with CRP data available
@@ -30,7 +40,7 @@ CYCLES = ["2005-2006", "2007-2008", "2009-2010",
 # ============================================================================
 
 # Statin drug names (generic names used in NHANES RXQ_RX)
-STATIN_NAMES = [
+STATIN_NAMES = (
     'atorvastatin',
     'simvastatin', 
     'rosuvastatin',
@@ -56,7 +66,7 @@ STATIN_NAMES = [
     'vytorin',
     'caduet',
     'advicor',
-]
+)
 
 # Therapeutic class codes for statins (HMG-CoA reductase inhibitors)
 # RXDDCI1A/B/C/D contain drug class codes
@@ -64,24 +74,109 @@ STATIN_THERAPEUTIC_CLASSES = [
     '358',  # HMG-CoA reductase inhibitors
 ]
 
+# Single case-insensitive alternation of all statin names, compiled once
+# (longest names first so combination products match in full)
+STATIN_PATTERN = re.compile(
+    '|'.join(re.escape(name) for name in sorted(STATIN_NAMES, key=len, reverse=True)),
+    re.IGNORECASE,
+)
+
+# RXQ_RX columns holding drug names and therapeutic class codes
+RXQ_NAME_COLS = ['RXDDRUG', 'RXDRUG']
+RXQ_CLASS_COLS = ['RXDDCI1A', 'RXDDCI1B', 'RXDDCI1C', 'RXDDCI2A', 'RXDDCI2B', 'RXDDCI2C']
+
+# Rows decoded per chunk when reading XPT files
+XPT_CHUNK_ROWS = 100_000
+
 
-def load_xpt(filepath: Path) -> pd.DataFrame:
-    """Load XPT file into pandas DataFrame."""
+def load_xpt(filepath: Path, usecols: list[str] | None = None) -> pd.DataFrame:
+    """
+    Load XPT file into pandas DataFrame with uppercase column names.
+    If usecols is given, only those columns are kept (projected per chunk).
+    
+    The first decode of each file is cached as parquet under
+    XPT_CACHE/<cycle>/ (outside data/raw, whose files other scripts glob);
+    later calls read the cache (projecting usecols at read time) as long as
+    it is not older than the XPT file.
+    """
+    cache = XPT_CACHE / filepath.parent.name / f"{filepath.stem}.parquet"
     try:
-        df = pd.read_sas(filepath, format='xport', encoding='latin1')
-        return df
+        if cache.exists() and cache.stat().st_mtime >= filepath.stat().st_mtime:
+            if usecols is not None:
+                available = set(pq.read_schema(cache).names)
+                usecols = [c for c in usecols if c in available]
+            return pd.read_parquet(cache, columns=usecols)
+        
+        # Decode in chunks: each full-width chunk is streamed to the cache and
+        # only its projected columns are kept in memory
+        chunks = []
+        writer = None
+        caching = True
+        tmp = cache.with_suffix('.parquet.tmp')
+        try:
+            with pd.read_sas(filepath, format='xport', encoding='latin1',
+                             chunksize=XPT_CHUNK_ROWS) as reader:
+                for chunk in reader:
+                    chunk.columns = chunk.columns.str.upper()
+                    if caching:
+                        try:
+                            if writer is None:
+                                tmp.parent.mkdir(parents=True, exist_ok=True)
+                                writer = pq.ParquetWriter(tmp, cache_schema(chunk),
+                                                          compression='zstd')
+                            writer.write_table(pa.Table.from_pandas(
+                                chunk, schema=writer.schema, preserve_index=False))
+                        except Exception as e:
+                            print(f"  Warning: Could not cache {filepath.name}: {e}")
+                            caching = False
+                    if usecols is not None:
+                        chunk = chunk[[c for c in usecols if c in chunk.columns]]
+                    chunks.append(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        
+        # Rename only after a complete decode so a partial cache is never read
+        if writer is not None:
+            if caching:
+                os.replace(tmp, cache)
+            else:
+                tmp.unlink(missing_ok=True)
+        
+        if not chunks:
+            return pd.DataFrame()
+        return pd.concat(chunks, ignore_index=True, copy=False)
     except Exception as e:
         print(f"  Warning: Could not load {filepath.name}: {e}")
         return pd.DataFrame()
 
 
-def find_file(cycle_dir: Path, pattern: str) -> Path | None:
-    """Find a file matching pattern in cycle directory (case-insensitive)."""
-    for ext in ['.XPT', '.xpt']:
-        matches = list(cycle_dir.glob(f"*{pattern}*{ext}"))
-        if matches:
-            return matches[0]
-    return None
+def cache_schema(chunk: pd.DataFrame) -> pa.Schema:
+    """
+    Arrow schema for an XPT parquet cache, taken from its first chunk.
+    XPT numerics decode as float64 and text as str, so a text column that is
+    empty throughout the first chunk is typed as string rather than null.
+    """
+    schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+    return pa.schema([
+        field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+        for field in schema
+    ], metadata=schema.metadata)
+
+
+def index_xpt_files(cycle_dir: Path) -> dict[str, Path]:
+    """Index the XPT files in a cycle directory by uppercase file name (one scan)."""
+    with os.scandir(cycle_dir) as entries:
+        return {
+            entry.name.upper(): cycle_dir / entry.name
+            for entry in sorted(entries, key=lambda e: e.name)
+            if entry.name.upper().endswith('.XPT')
+        }
+
+
+def find_file(xpt_files: dict[str, Path], pattern: str) -> Path | None:
+    """Find a file matching pattern in an indexed cycle directory (case-insensitive)."""
+    return next((path for name, path in xpt_files.items() if pattern in name), None)
 
 
 def identify_statin_users(rxq_df: pd.DataFrame) -> pd.DataFrame:
@@ -92,28 +187,17 @@ def identify_statin_users(rxq_df: pd.DataFrame) -> pd.DataFrame:
     if rxq_df.empty or 'SEQN' not in rxq_df.columns:
         return pd.DataFrame(columns=['SEQN', 'statin_user'])
     
-    # Standardize column names to uppercase
-    rxq_df.columns = [c.upper() for c in rxq_df.columns]
-    
-    statin_users = set()
+    is_statin = pd.Series(False, index=rxq_df.index)
     
     # Method 1: Check drug name (RXDDRUG)
-    drug_name_cols = ['RXDDRUG', 'RXDRUG']
-    for col in drug_name_cols:
+    for col in RXQ_NAME_COLS:
         if col in rxq_df.columns:
-            for idx, row in rxq_df.iterrows():
-                drug_name = str(row.get(col, '')).lower()
-                if any(statin in drug_name for statin in STATIN_NAMES):
-                    statin_users.add(row['SEQN'])
+            is_statin |= rxq_df[col].astype(str).str.contains(STATIN_PATTERN, na=False)
     
     # Method 2: Check therapeutic class codes
-    class_cols = ['RXDDCI1A', 'RXDDCI1B', 'RXDDCI1C', 'RXDDCI2A', 'RXDDCI2B', 'RXDDCI2C']
-    for col in class_cols:
+    for col in RXQ_CLASS_COLS:
         if col in rxq_df.columns:
-            for idx, row in rxq_df.iterrows():
-                class_code = str(row.get(col, ''))
-                if class_code in STATIN_THERAPEUTIC_CLASSES:
-                    statin_users.add(row['SEQN'])
+            is_statin |= rxq_df[col].astype(str).isin(STATIN_THERAPEUTIC_CLASSES)
     
     # Method 3: Check generic drug code (RXDDCN1A, RXDDCN1B for drug category)
     # Category 019 = cardiovascular agents, but too broad - rely on names/classes
@@ -121,7 +205,8 @@ def identify_statin_users(rxq_df: pd.DataFrame) -> pd.DataFrame:
     # Create output dataframe with all unique SEQNs
     all_seqn = rxq_df['SEQN'].unique()
     result = pd.DataFrame({'SEQN': all_seqn})
-    result['statin_user'] = result['SEQN'].isin(statin_users).astype(int)
+    statin_users = rxq_df.loc[is_statin, 'SEQN'].unique()
+    result['statin_user'] = result['SEQN'].isin(statin_users).astype('int8')
     
     return result
 
@@ -133,17 +218,32 @@ def calculate_ldl(tc: pd.Series, hdl: pd.Series, tg: pd.Series,
     Uses direct LDL as fallback when Friedewald is invalid or missing.
     Friedewald only valid when TG < 400 mg/dL.
     """
-    # Friedewald calculation
-    ldl_calc = tc - hdl - (tg / 5)
+    tg = tg.to_numpy(dtype=np.float64)
+    
+    # Friedewald calculation, accumulated in one output buffer
+    ldl_calc = np.subtract(tc.to_numpy(dtype=np.float64), hdl.to_numpy(dtype=np.float64))
+    ldl_calc -= tg / 5
     
     # Set to NaN if TG >= 400 (Friedewald not valid)
-    ldl_calc = ldl_calc.where(tg < 400, np.nan)
+    ldl_calc[~(tg < 400)] = np.nan
     
     # Use direct LDL as fallback if available
     if direct_ldl is not None:
-        ldl_calc = ldl_calc.fillna(direct_ldl)
+        np.copyto(ldl_calc, direct_ldl.to_numpy(dtype=np.float64), where=np.isnan(ldl_calc))
     
-    return ldl_calc
+    return pd.Series(ldl_calc, index=tc.index)
+
+
+def seqn_indexed(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Index a frame on SEQN in ascending order so joins take pandas'
+    monotonic-index path. XPT files are already sorted by SEQN, so the
+    sort is skipped in practice.
+    """
+    df = df.set_index('SEQN')
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index()
+    return df
 
 
 def process_cycle(cycle: str) -> pd.DataFrame:
@@ -155,33 +255,40 @@ def process_cycle(cycle: str) -> pd.DataFrame:
         print(f"  Directory not found: {cycle_dir}")
         return pd.DataFrame()
     
+    xpt_files = index_xpt_files(cycle_dir)
+    
     # -------------------------------------------------------------------------
     # Load Demographics
     # -------------------------------------------------------------------------
-    demo_file = find_file(cycle_dir, "DEMO")
+    demo_file = find_file(xpt_files, "DEMO")
     if not demo_file:
         print(f"  No DEMO file found")
         return pd.DataFrame()
     
-    df = load_xpt(demo_file)
-    if df.empty:
-        return pd.DataFrame()
-    
-    df.columns = [c.upper() for c in df.columns]
-    print(f"  Loaded {len(df):,} participants from {demo_file.name}")
-    
     # Keep relevant demographic columns
     demo_cols = ['SEQN', 'RIDAGEYR', 'RIAGENDR', 'RIDRETH1', 'RIDRETH3',
                  'DMDEDUC2', 'INDFMPIR', 'WTMEC2YR', 'WTINT2YR', 
                  'SDMVPSU', 'SDMVSTRA']
     
+    df = load_xpt(demo_file, usecols=demo_cols + ['WTMECPRP', 'WTINTPRP'])
+    if df.empty:
+        return pd.DataFrame()
+    
+    print(f"  Loaded {len(df):,} participants from {demo_file.name}")
+    
     # Handle 2017-2020 pre-pandemic weight naming
-    if 'WTMECPRP' in df.columns:
+    have = set(df.columns)
+    if 'WTMECPRP' in have:
         df['WTMEC2YR'] = df['WTMECPRP']
-    if 'WTINTPRP' in df.columns:
+        have.add('WTMEC2YR')
+    if 'WTINTPRP' in have:
         df['WTINT2YR'] = df['WTINTPRP']
+        have.add('WTINT2YR')
+    
+    df = df[[c for c in demo_cols if c in have]].copy()
     
-    df = df[[c for c in demo_cols if c in df.columns]].copy()
+    # Component frames are indexed on sorted SEQN and joined in a single pass below
+    extras = []
     
     # -------------------------------------------------------------------------
     # Load and merge laboratory data
@@ -195,107 +302,93 @@ def process_cycle(cycle: str) -> pd.DataFrame:
     }
     
     for file_base, var_names in lab_files.items():
-        lab_file = find_file(cycle_dir, file_base)
+        lab_file = find_file(xpt_files, file_base)
         if lab_file:
-            lab_df = load_xpt(lab_file)
-            if not lab_df.empty:
-                lab_df.columns = [c.upper() for c in lab_df.columns]
-                # Keep only SEQN and target variables
-                keep_cols = ['SEQN'] + [v for v in var_names if v in lab_df.columns]
-                if len(keep_cols) > 1:
-                    df = df.merge(lab_df[keep_cols], on='SEQN', how='left')
+            lab_df = load_xpt(lab_file, usecols=['SEQN'] + var_names)
+            # load_xpt keeps only SEQN and whichever target variables exist
+            if lab_df.shape[1] > 1:
+                extras.append(seqn_indexed(lab_df))
     
     # Load CRP/HSCRP separately to handle different file naming
     # Try HSCRP first (2011+), then CRP (2005-2010)
     crp_loaded = False
     for pattern in ['HSCRP', 'CRP']:
-        crp_file = find_file(cycle_dir, pattern)
+        crp_file = find_file(xpt_files, pattern)
         if crp_file and not crp_loaded:
-            crp_df = load_xpt(crp_file)
-            if not crp_df.empty:
-                crp_df.columns = [c.upper() for c in crp_df.columns]
-                # CRP variable may be named LBXCRP or LBXHSCRP
-                crp_vars = [v for v in ['LBXHSCRP', 'LBXCRP'] if v in crp_df.columns]
-                if crp_vars:
-                    keep_cols = ['SEQN'] + crp_vars
-                    df = df.merge(crp_df[keep_cols], on='SEQN', how='left')
-                    crp_loaded = True
+            crp_df = load_xpt(crp_file, usecols=['SEQN', 'LBXHSCRP', 'LBXCRP'])
+            # CRP variable may be named LBXCRP or LBXHSCRP
+            if crp_df.shape[1] > 1:
+                extras.append(seqn_indexed(crp_df))
+                crp_loaded = True
     
     # -------------------------------------------------------------------------
     # Load and merge examination data (BMI, Blood Pressure)
     # -------------------------------------------------------------------------
     # Body measures
-    bmx_file = find_file(cycle_dir, "BMX")
+    bmx_file = find_file(xpt_files, "BMX")
     if bmx_file:
-        bmx_df = load_xpt(bmx_file)
+        bmx_cols = ['SEQN', 'BMXBMI', 'BMXWT', 'BMXHT']
+        bmx_df = load_xpt(bmx_file, usecols=bmx_cols)
         if not bmx_df.empty:
-            bmx_df.columns = [c.upper() for c in bmx_df.columns]
-            bmx_cols = ['SEQN', 'BMXBMI', 'BMXWT', 'BMXHT']
-            keep = [c for c in bmx_cols if c in bmx_df.columns]
-            df = df.merge(bmx_df[keep], on='SEQN', how='left')
+            extras.append(seqn_indexed(bmx_df))
     
     # Blood pressure
-    bp_file = find_file(cycle_dir, "BPX")
+    bp_file = find_file(xpt_files, "BPX")
     if not bp_file:
-        bp_file = find_file(cycle_dir, "BPXO")  # 2017-2020 uses BPXO
+        bp_file = find_file(xpt_files, "BPXO")  # 2017-2020 uses BPXO
     if bp_file:
-        bp_df = load_xpt(bp_file)
+        bp_cols = ['SEQN', 'BPXSY1', 'BPXSY2', 'BPXSY3', 
+                  'BPXDI1', 'BPXDI2', 'BPXDI3',
+                  'BPXOSY1', 'BPXOSY2', 'BPXOSY3',  # 2017-2020 oscillometric
+                  'BPXODI1', 'BPXODI2', 'BPXODI3']
+        bp_df = load_xpt(bp_file, usecols=bp_cols)
         if not bp_df.empty:
-            bp_df.columns = [c.upper() for c in bp_df.columns]
-            bp_cols = ['SEQN', 'BPXSY1', 'BPXSY2', 'BPXSY3', 
-                      'BPXDI1', 'BPXDI2', 'BPXDI3',
-                      'BPXOSY1', 'BPXOSY2', 'BPXOSY3',  # 2017-2020 oscillometric
-                      'BPXODI1', 'BPXODI2', 'BPXODI3']
-            keep = [c for c in bp_cols if c in bp_df.columns]
-            df = df.merge(bp_df[keep], on='SEQN', how='left')
+            extras.append(seqn_indexed(bp_df))
     
     # -------------------------------------------------------------------------
     # Load and merge questionnaire data
     # -------------------------------------------------------------------------
     # Diabetes questionnaire
-    diq_file = find_file(cycle_dir, "DIQ")
+    diq_file = find_file(xpt_files, "DIQ")
     if diq_file:
-        diq_df = load_xpt(diq_file)
+        diq_cols = ['SEQN', 'DIQ010', 'DIQ050', 'DIQ070']
+        diq_df = load_xpt(diq_file, usecols=diq_cols)
         if not diq_df.empty:
-            diq_df.columns = [c.upper() for c in diq_df.columns]
-            diq_cols = ['SEQN', 'DIQ010', 'DIQ050', 'DIQ070']
-            keep = [c for c in diq_cols if c in diq_df.columns]
-            df = df.merge(diq_df[keep], on='SEQN', how='left')
+            extras.append(seqn_indexed(diq_df))
     
     # Blood pressure questionnaire
-    bpq_file = find_file(cycle_dir, "BPQ")
+    bpq_file = find_file(xpt_files, "BPQ")
     if bpq_file:
-        bpq_df = load_xpt(bpq_file)
+        bpq_cols = ['SEQN', 'BPQ020', 'BPQ040A']  # Ever told high BP, taking meds
+        bpq_df = load_xpt(bpq_file, usecols=bpq_cols)
         if not bpq_df.empty:
-            bpq_df.columns = [c.upper() for c in bpq_df.columns]
-            bpq_cols = ['SEQN', 'BPQ020', 'BPQ040A']  # Ever told high BP, taking meds
-            keep = [c for c in bpq_cols if c in bpq_df.columns]
-            df = df.merge(bpq_df[keep], on='SEQN', how='left')
+            extras.append(seqn_indexed(bpq_df))
     
     # Smoking questionnaire
-    smq_file = find_file(cycle_dir, "SMQ")
+    smq_file = find_file(xpt_files, "SMQ")
     if smq_file:
-        smq_df = load_xpt(smq_file)
+        smq_cols = ['SEQN', 'SMQ020', 'SMQ040']
+        smq_df = load_xpt(smq_file, usecols=smq_cols)
         if not smq_df.empty:
-            smq_df.columns = [c.upper() for c in smq_df.columns]
-            smq_cols = ['SEQN', 'SMQ020', 'SMQ040']
-            keep = [c for c in smq_cols if c in smq_df.columns]
-            df = df.merge(smq_df[keep], on='SEQN', how='left')
+            extras.append(seqn_indexed(smq_df))
+    
+    if extras:
+        df = seqn_indexed(df).join(extras, how='left').reset_index()
     
     # -------------------------------------------------------------------------
     # Load prescription medications and identify statin users
     # -------------------------------------------------------------------------
-    rxq_file = find_file(cycle_dir, "RXQ_RX")
+    rxq_file = find_file(xpt_files, "RXQ_RX")
     if rxq_file:
-        rxq_df = load_xpt(rxq_file)
+        rxq_df = load_xpt(rxq_file, usecols=['SEQN'] + RXQ_NAME_COLS + RXQ_CLASS_COLS)
         if not rxq_df.empty:
             statin_df = identify_statin_users(rxq_df)
             if not statin_df.empty:
                 df = df.merge(statin_df, on='SEQN', how='left')
-                df['statin_user'] = df['statin_user'].fillna(0).astype(int)
+                df['statin_user'] = df['statin_user'].fillna(0).astype('int8')
                 print(f"  Identified {statin_df['statin_user'].sum():,} statin users")
     else:
-        df['statin_user'] = 0
+        df['statin_user'] = np.int8(0)
         print(f"  Warning: No RXQ_RX file found for {cycle}")
     
     # Add cycle identifier
@@ -304,18 +397,44 @@ def process_cycle(cycle: str) -> pd.DataFrame:
     return df
 
 
+def run_cycle(cycle: str) -> tuple[pd.DataFrame, str]:
+    """
+    Run process_cycle with its progress output buffered, so pool workers
+    do not contend for stdout and main can print each cycle's log in order.
+    """
+    buf = io.StringIO()
+    with redirect_stdout(buf):
+        df = process_cycle(cycle)
+    return df, buf.getvalue()
+
+
+def coalesce(df: pd.DataFrame, cols: list[str]) -> np.ndarray:
+    """Return the first non-missing value across cols for each row (NaN if none)."""
+    out = np.full(len(df), np.nan)
+    for col in cols:
+        if col in df.columns:
+            missing = np.isnan(out)
+            out[missing] = df[col].to_numpy(dtype=np.float64)[missing]
+    return out
+
+
 def harmonize_variables(df: pd.DataFrame) -> pd.DataFrame:
     """Harmonize variable names and create derived variables."""
     print("\n[Harmonizing variables]")
     
+    have = set(df.columns)
+    
+    # Questionnaire items read below; add any absent from every cycle as NaN
+    for col in ['DIQ010', 'DIQ050', 'DIQ070', 'BPQ040A', 'SMQ020', 'SMQ040']:
+        if col not in have:
+            df[col] = np.nan
+    
     # -------------------------------------------------------------------------
     # Standardize CRP variable name
     # Coalesce LBXHSCRP (2011+) and LBXCRP (2005-2010) since both may exist
     # after concatenating cycles
     # -------------------------------------------------------------------------
-    hscrp_col = df.get('LBXHSCRP', pd.Series([np.nan] * len(df), index=df.index))
-    crp_col = df.get('LBXCRP', pd.Series([np.nan] * len(df), index=df.index))
-    df['hscrp'] = hscrp_col.fillna(crp_col)
+    df['hscrp'] = coalesce(df, ['LBXHSCRP', 'LBXCRP'])
     
     # -------------------------------------------------------------------------
     # Standardize lipid variables
@@ -323,9 +442,9 @@ def harmonize_variables(df: pd.DataFrame) -> pd.DataFrame:
     df['total_chol'] = df.get('LBXTC', np.nan)
     
     # HDL - may be LBDHDD or LBXHDD depending on cycle
-    if 'LBDHDD' in df.columns:
+    if 'LBDHDD' in have:
         df['hdl'] = df['LBDHDD']
-    elif 'LBXHDD' in df.columns:
+    elif 'LBXHDD' in have:
         df['hdl'] = df['LBXHDD']
     else:
         df['hdl'] = np.nan
@@ -339,9 +458,7 @@ def harmonize_variables(df: pd.DataFrame) -> pd.DataFrame:
     # Standardize fasting subsample weight
     # Coalesce WTSAF2YR (most cycles) and WTSAFPRP (2017-2020)
     # -------------------------------------------------------------------------
-    wtsaf2yr = df.get('WTSAF2YR', pd.Series([np.nan] * len(df), index=df.index))
-    wtsafprp = df.get('WTSAFPRP', pd.Series([np.nan] * len(df), index=df.index))
-    df['fasting_weight'] = wtsaf2yr.fillna(wtsafprp)
+    df['fasting_weight'] = coalesce(df, ['WTSAF2YR', 'WTSAFPRP'])
     
     # -------------------------------------------------------------------------
     # Standardize demographics
@@ -360,14 +477,14 @@ def harmonize_variables(df: pd.DataFrame) -> pd.DataFrame:
     dbp_cols = [c for c in df.columns if c.startswith(('BPXDI', 'BPXODI'))]
     
     if sbp_cols:
-        df['sbp_mean'] = df[sbp_cols].mean(axis=1)
+        df['sbp_mean'] = np.nanmean(df[sbp_cols].to_numpy(dtype=np.float32), axis=1)
     else:
-        df['sbp_mean'] = np.nan
+        df['sbp_mean'] = np.float32(np.nan)
         
     if dbp_cols:
-        df['dbp_mean'] = df[dbp_cols].mean(axis=1)
+        df['dbp_mean'] = np.nanmean(df[dbp_cols].to_numpy(dtype=np.float32), axis=1)
     else:
-        df['dbp_mean'] = np.nan
+        df['dbp_mean'] = np.float32(np.nan)
     
     # -------------------------------------------------------------------------
     # Standardize other variables
@@ -385,20 +502,24 @@ def harmonize_variables(df: pd.DataFrame) -> pd.DataFrame:
     # Create derived clinical variables
     # -------------------------------------------------------------------------
     # Diabetes: HbA1c ≥6.5% OR FPG ≥126 OR told by doctor OR on insulin/oral meds
-    df['diabetes'] = (
-        (df['hba1c'] >= 6.5) |
-        (df['fasting_glucose'] >= 126) |
-        (df.get('DIQ010', 2) == 1) |  # Doctor told diabetes
-        (df.get('DIQ050', 2) == 1) |  # Taking insulin
-        (df.get('DIQ070', 2) == 1)    # Taking oral diabetes meds
-    ).astype(float)
-    df.loc[df[['hba1c', 'fasting_glucose', 'DIQ010']].isna().all(axis=1), 'diabetes'] = np.nan
+    hba1c = df['hba1c'].to_numpy(dtype=np.float64)
+    glucose = df['fasting_glucose'].to_numpy(dtype=np.float64)
+    diq010 = df['DIQ010'].to_numpy(dtype=np.float64)
+    diabetes = np.logical_or.reduce([
+        hba1c >= 6.5,
+        glucose >= 126,
+        diq010 == 1,                                     # Doctor told diabetes
+        df['DIQ050'].to_numpy(dtype=np.float64) == 1,   # Taking insulin
+        df['DIQ070'].to_numpy(dtype=np.float64) == 1,   # Taking oral diabetes meds
+    ])
+    diabetes_unknown = np.isnan(hba1c) & np.isnan(glucose) & np.isnan(diq010)
+    df['diabetes'] = np.where(diabetes_unknown, np.nan, diabetes).astype('float32')
     
     # Prediabetes: HbA1c 5.7-6.4% OR FPG 100-125 mg/dL (excluding those with diabetes)
     df['prediabetes'] = (
         ((df['hba1c'] >= 5.7) & (df['hba1c'] < 6.5)) |
         ((df['fasting_glucose'] >= 100) & (df['fasting_glucose'] < 126))
-    ).astype(float)
+    ).astype('float32')
     # Exclude those already classified as diabetic
     df.loc[df['diabetes'] == 1, 'prediabetes'] = 0
     df.loc[df[['hba1c', 'fasting_glucose']].isna().all(axis=1), 'prediabetes'] = np.nan
@@ -410,27 +531,27 @@ def harmonize_variables(df: pd.DataFrame) -> pd.DataFrame:
     df.loc[df[['diabetes', 'prediabetes']].isna().all(axis=1), 'glycemic_status'] = np.nan
     
     # Hypertension: SBP ≥130 OR DBP ≥80 OR taking BP medication
-    df['hypertension'] = (
-        (df['sbp_mean'] >= 130) |
-        (df['dbp_mean'] >= 80) |
-        (df.get('BPQ040A', 2) == 1)  # Taking BP medication
-    ).astype(float)
-    df.loc[df[['sbp_mean', 'dbp_mean', 'BPQ040A']].isna().all(axis=1), 'hypertension'] = np.nan
+    sbp = df['sbp_mean'].to_numpy(dtype=np.float64)
+    dbp = df['dbp_mean'].to_numpy(dtype=np.float64)
+    bp_med = df['BPQ040A'].to_numpy(dtype=np.float64)  # Taking BP medication
+    hypertension = (sbp >= 130) | (dbp >= 80) | (bp_med == 1)
+    hypertension_unknown = np.isnan(sbp) & np.isnan(dbp) & np.isnan(bp_med)
+    df['hypertension'] = np.where(hypertension_unknown, np.nan, hypertension).astype('float32')
     
     # Smoking status: 1=Current, 2=Former, 3=Never
-    smoke_100 = df.get('SMQ020', np.nan)  # Smoked 100+ cigarettes
-    smoke_now = df.get('SMQ040', np.nan)  # Currently smoke
+    smoke_100 = df['SMQ020']  # Smoked 100+ cigarettes
+    smoke_now = df['SMQ040']  # Currently smoke
     
     df['smoking_status'] = np.nan
     df.loc[smoke_100 == 2, 'smoking_status'] = 3  # Never (didn't smoke 100+)
     df.loc[(smoke_100 == 1) & (smoke_now.isin([1, 2])), 'smoking_status'] = 1  # Current
     df.loc[(smoke_100 == 1) & (smoke_now == 3), 'smoking_status'] = 2  # Former
     
-    df['current_smoker'] = (df['smoking_status'] == 1).astype(float)
+    df['current_smoker'] = (df['smoking_status'] == 1).astype('float32')
     df.loc[df['smoking_status'].isna(), 'current_smoker'] = np.nan
     
     # Obesity
-    df['obese'] = (df['bmi'] >= 30).astype(float)
+    df['obese'] = (df['bmi'] >= 30).astype('float32')
     df.loc[df['bmi'].isna(), 'obese'] = np.nan
     
     return df
@@ -487,47 +608,37 @@ def create_rir_cohort(df: pd.DataFrame) -> pd.DataFrame:
     # Create RIR-specific variables
     # -------------------------------------------------------------------------
     # LDL <70 mg/dL flag
-    df['ldl_under_70'] = (df['ldl_calc'] < 70).astype(int)
+    df['ldl_under_70'] = (df['ldl_calc'] < 70).astype('int8')
     
     # LDL <55 mg/dL flag (sensitivity)
-    df['ldl_under_55'] = (df['ldl_calc'] < 55).astype(int)
+    df['ldl_under_55'] = (df['ldl_calc'] < 55).astype('int8')
     
     # High hs-CRP ≥2 mg/L
-    df['hscrp_high'] = (df['hscrp'] >= 2).astype(int)
+    df['hscrp_high'] = (df['hscrp'] >= 2).astype('int8')
     
     # Very high hs-CRP ≥3 mg/L (sensitivity)
-    df['hscrp_very_high'] = (df['hscrp'] >= 3).astype(int)
+    df['hscrp_very_high'] = (df['hscrp'] >= 3).astype('int8')
+    
+    # RIR flags from the 0/1 int8 arrays (bitwise AND, no boolean temporaries)
+    statin_ldl70 = df['statin_user'].to_numpy(dtype='int8') & df['ldl_under_70'].to_numpy()
+    hscrp_high = df['hscrp_high'].to_numpy()
     
     # Primary RIR definition: statin + LDL<70 + hs-CRP≥2
-    df['rir'] = ((df['statin_user'] == 1) & 
-                 (df['ldl_under_70'] == 1) & 
-                 (df['hscrp_high'] == 1)).astype(int)
+    df['rir'] = statin_ldl70 & hscrp_high
     
     # Alternative RIR with hs-CRP ≥3
-    df['rir_strict'] = ((df['statin_user'] == 1) & 
-                        (df['ldl_under_70'] == 1) & 
-                        (df['hscrp_very_high'] == 1)).astype(int)
+    df['rir_strict'] = statin_ldl70 & df['hscrp_very_high'].to_numpy()
     
     # RIR with LDL <55 threshold
-    df['rir_ldl55'] = ((df['statin_user'] == 1) & 
-                       (df['ldl_under_55'] == 1) & 
-                       (df['hscrp_high'] == 1)).astype(int)
+    df['rir_ldl55'] = (df['statin_user'].to_numpy(dtype='int8') &
+                       df['ldl_under_55'].to_numpy() & hscrp_high)
     
     # -------------------------------------------------------------------------
     # PI-requested 6-group LDL × Statin stratification
     # -------------------------------------------------------------------------
-    # LDL-C categories: ≤70, 70-130, >130
-    def ldl_category(ldl):
-        if pd.isna(ldl):
-            return np.nan
-        elif ldl <= 70:
-            return 1  # ≤70
-        elif ldl <= 130:
-            return 2  # 70-130
-        else:
-            return 3  # >130
-    
-    df['ldl_cat'] = df['ldl_calc'].apply(ldl_category)
+    # LDL-C categories: 1 = ≤70, 2 = 70-130, 3 = >130
+    df['ldl_cat'] = pd.cut(df['ldl_calc'], bins=[-np.inf, 70, 130, np.inf],
+                           labels=[1, 2, 3]).astype(float)
     
     # 6-group variable: LDL category × Statin status
     # 1 = LDL≤70, statin user
@@ -536,19 +647,10 @@ def create_rir_cohort(df: pd.DataFrame) -> pd.DataFrame:
     # 4 = LDL 70-130, no statin
     # 5 = LDL >130, statin user
     # 6 = LDL >130, no statin
-    def ldl_statin_group(row):
-        if pd.isna(row['ldl_cat']) or pd.isna(row['statin_user']):
-            return np.nan
-        ldl_c = int(row['ldl_cat'])
-        statin = int(row['statin_user'])
-        if ldl_c == 1:  # ≤70
-            return 1 if statin == 1 else 2
-        elif ldl_c == 2:  # 70-130
-            return 3 if statin == 1 else 4
-        else:  # >130
-            return 5 if statin == 1 else 6
-    
-    df['ldl_statin_group'] = df.apply(ldl_statin_group, axis=1)
+    # i.e. group = 2 * ldl_cat - statin_user
+    ldl_c = df['ldl_cat'].to_numpy(dtype=float)
+    statin = df['statin_user'].to_numpy(dtype=float)
+    df['ldl_statin_group'] = np.where(np.isnan(statin), np.nan, 2 * ldl_c - (statin == 1))
     
     # -------------------------------------------------------------------------
     # Summary statistics
@@ -567,20 +669,31 @@ def main():
     print("RIR STUDY - DATA PROCESSING")
     print("="*70)
     
-    # Process all cycles
+    # Process all cycles (independent, so one worker process per cycle;
+    # map preserves cycle order in the results, and each cycle's buffered
+    # log is printed as a block)
+    n_workers = min(len(CYCLES), os.cpu_count() or 1)
     all_data = []
-    for cycle in CYCLES:
-        cycle_data = process_cycle(cycle)
-        if not cycle_data.empty:
-            all_data.append(cycle_data)
+    with ProcessPoolExecutor(max_workers=n_workers) as ex:
+        for d, log in ex.map(run_cycle, CYCLES):
+            print(log, end='')
+            if not d.empty:
+                all_data.append(d)
     
     if not all_data:
         print("\nERROR: No data loaded. Run 01_download_data.py first.")
         return
     
-    # Combine all cycles
+    # Combine all cycles (Arrow concatenation is chunked, so the per-cycle
+    # tables are not copied into a second full-size buffer; columns missing
+    # from a cycle are filled with nulls)
     print("\n[Combining cycles]")
-    df = pd.concat(all_data, ignore_index=True)
+    tables = [pa.Table.from_pandas(d, preserve_index=False) for d in all_data]
+    all_data.clear()
+    combined = pa.concat_tables(tables, promote_options='permissive')
+    tables.clear()
+    df = combined.to_pandas(self_destruct=True)
+    del combined
     print(f"  Combined N: {len(df):,}")
     
     # Harmonize variables
@@ -620,6 +733,16 @@ def main():
     
     df_final = df[[c for c in analysis_vars if c in df.columns]].copy()
     
+    # Low-cardinality codes as categoricals (small int codes in memory,
+    # dictionary-encoded in parquet). Cast here, after all arithmetic on them.
+    categorical_vars = [
+        'cycle', 'sex', 'race_eth', 'education', 'glycemic_status',
+        'smoking_status', 'ldl_cat', 'ldl_statin_group',
+    ]
+    for col in categorical_vars:
+        if col in df_final.columns:
+            df_final[col] = df_final[col].astype('category')
+    
     # -------------------------------------------------------------------------
     # Save processed data
     # -------------------------------------------------------------------------
@@ -628,15 +751,20 @@ def main():
     (OUTPUT_DIR / "tables").mkdir(exist_ok=True)
     (OUTPUT_DIR / "figures").mkdir(exist_ok=True)
     
+    # Convert to Arrow once; both writers below encode from the same buffers
+    table = pa.Table.from_pandas(df_final, preserve_index=False)
+    
     # Save as parquet for efficiency
     output_path = DATA_PROCESSED / "rir_analytic_cohort.parquet"
-    df_final.to_parquet(output_path)
+    pq.write_table(table, output_path, compression='zstd')
     print(f"\n[Saved] {output_path}")
     
-    # Also save as CSV for R
-    csv_path = DATA_PROCESSED / "rir_analytic_cohort.csv"
-    df_final.to_csv(csv_path, index=False)
-    print(f"[Saved] {csv_path}")
+    # Also save as CSV for R (read by the 03/04/06/08 scripts); pass --no-csv
+    # to skip it when only the parquet is needed
+    if '--no-csv' not in sys.argv:
+        csv_path = DATA_PROCESSED / "rir_analytic_cohort.csv"
+        pcsv.write_csv(table, csv_path)
+        print(f"[Saved] {csv_path}")
     
     # -------------------------------------------------------------------------
     # Summary report
@@ -646,7 +774,7 @@ def main():
     print("="*70)
     print(f"\nTotal participants: {len(df_final):,}")
     print(f"\nBy cycle:")
-    print(df_final.groupby('cycle').size().to_string())
+    print(df_final.groupby('cycle', observed=True).size().to_string())
     print(f"\nStatin users: {df_final['statin_user'].sum():,}")
     print(f"Statin users with LDL<70: {(df_final['statin_user'] & df_final['ldl_under_70']).sum():,}")
     print(f"\nPrimary RIR cases: {df_final['rir'].sum():,}")